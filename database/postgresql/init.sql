@@ -4,6 +4,7 @@
 -- Create extensions
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 CREATE EXTENSION IF NOT EXISTS "pg_trgm";
+CREATE EXTENSION IF NOT EXISTS timescaledb;
 
 -- Files table for storing uploaded file metadata
 CREATE TABLE IF NOT EXISTS files (
@@ -32,9 +33,9 @@ CREATE TABLE IF NOT EXISTS edge_servers (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
--- Request logs table for analytics
+-- Request logs table for analytics (TimescaleDB hypertable, see below)
 CREATE TABLE IF NOT EXISTS request_logs (
-    id BIGSERIAL PRIMARY KEY,
+    id BIGSERIAL,
     file_id INTEGER REFERENCES files(id) ON DELETE SET NULL,
     edge_server_id VARCHAR(50) REFERENCES edge_servers(id) ON DELETE SET NULL,
     client_ip INET,
@@ -45,13 +46,26 @@ CREATE TABLE IF NOT EXISTS request_logs (
     cache_status VARCHAR(10) DEFAULT 'MISS',
     response_time INTEGER, -- in milliseconds
     bytes_sent BIGINT DEFAULT 0,
-    timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    is_hit BOOLEAN GENERATED ALWAYS AS (cache_status = 'HIT') STORED,
+    is_error BOOLEAN GENERATED ALWAYS AS (status_code >= 400) STORED,
+    
+    -- Hypertable unique keys must include the partitioning column
+    PRIMARY KEY (id, timestamp),
     
     -- Indexes for analytics queries
     CONSTRAINT request_logs_status_code_valid CHECK (status_code >= 100 AND status_code < 600),
     CONSTRAINT request_logs_cache_status_valid CHECK (cache_status IN ('HIT', 'MISS', 'STALE', 'BYPASS'))
 );
 
+-- Partition request logs into daily chunks so time-range queries only touch recent chunks
+SELECT create_hypertable(
+    'request_logs', 'timestamp',
+    chunk_time_interval => INTERVAL '1 day',
+    if_not_exists => TRUE,
+    migrate_data => TRUE
+);
+
 -- User sessions table (optional)
 CREATE TABLE IF NOT EXISTS user_sessions (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -79,6 +93,12 @@ CREATE INDEX IF NOT EXISTS idx_request_logs_client_ip ON request_logs(client_ip)
 CREATE INDEX IF NOT EXISTS idx_request_logs_status_code ON request_logs(status_code);
 CREATE INDEX IF NOT EXISTS idx_request_logs_cache_status ON request_logs(cache_status);
 CREATE INDEX IF NOT EXISTS idx_request_logs_composite ON request_logs(timestamp DESC, cache_status, status_code);
+CREATE INDEX IF NOT EXISTS idx_request_logs_time_hit ON request_logs(timestamp) WHERE is_hit;
+
+-- Covering indexes for time-window analytics grouped by server, file and status
+CREATE INDEX IF NOT EXISTS idx_request_logs_ts_edge ON request_logs(timestamp, edge_server_id) INCLUDE (response_time, bytes_sent, cache_status);
+CREATE INDEX IF NOT EXISTS idx_request_logs_ts_file ON request_logs(timestamp, file_id) INCLUDE (bytes_sent, cache_status, response_time);
+CREATE INDEX IF NOT EXISTS idx_request_logs_ts_status ON request_logs(timestamp, status_code);
 
 CREATE INDEX IF NOT EXISTS idx_user_sessions_token ON user_sessions(session_token);
 CREATE INDEX IF NOT EXISTS idx_user_sessions_expires ON user_sessions(expires_at);
@@ -120,10 +140,10 @@ CREATE OR REPLACE VIEW request_summary AS
 SELECT 
     DATE(timestamp) as date,
     COUNT(*) as total_requests,
-    COUNT(CASE WHEN cache_status = 'HIT' THEN 1 END) as cache_hits,
-    COUNT(CASE WHEN cache_status = 'MISS' THEN 1 END) as cache_misses,
+    COUNT(*) FILTER (WHERE is_hit) as cache_hits,
+    COUNT(*) FILTER (WHERE cache_status = 'MISS') as cache_misses,
     ROUND(
-        (COUNT(CASE WHEN cache_status = 'HIT' THEN 1 END)::numeric / 
+        (COUNT(*) FILTER (WHERE is_hit)::numeric / 
          COUNT(*)::numeric) * 100, 2
     ) as cache_hit_rate,
     SUM(bytes_sent) as total_bytes,
@@ -132,6 +152,135 @@ FROM request_logs
 GROUP BY DATE(timestamp)
 ORDER BY date DESC;
 
+-- Hourly rollup of request logs for reports
+CREATE MATERIALIZED VIEW IF NOT EXISTS request_logs_hourly
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT 
+    time_bucket('1 hour', timestamp) as bucket,
+    file_id,
+    status_code,
+    COUNT(*) as requests,
+    SUM(bytes_sent) as bytes_sent
+FROM request_logs
+GROUP BY bucket, file_id, status_code
+WITH NO DATA;
+
+SELECT add_continuous_aggregate_policy(
+    'request_logs_hourly',
+    start_offset => INTERVAL '3 days',
+    end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '30 minutes',
+    if_not_exists => TRUE
+);
+
+CREATE INDEX IF NOT EXISTS idx_request_logs_hourly_bucket_file ON request_logs_hourly(bucket, file_id);
+
+-- Daily report summaries, refreshed by background jobs so reports don't scan request_logs
+CREATE TABLE IF NOT EXISTS daily_request_stats (
+    date DATE PRIMARY KEY,
+    total_requests BIGINT NOT NULL DEFAULT 0,
+    unique_visitors BIGINT NOT NULL DEFAULT 0,
+    total_bytes BIGINT NOT NULL DEFAULT 0,
+    avg_response_time DOUBLE PRECISION,
+    cache_hits BIGINT NOT NULL DEFAULT 0,
+    cache_misses BIGINT NOT NULL DEFAULT 0,
+    success_requests BIGINT NOT NULL DEFAULT 0,
+    error_requests BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS daily_file_stats (
+    date DATE NOT NULL,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    requests BIGINT NOT NULL DEFAULT 0,
+    bytes BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, file_id)
+);
+
+CREATE TABLE IF NOT EXISTS daily_status_stats (
+    date DATE NOT NULL,
+    status_code INTEGER NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, status_code)
+);
+
+CREATE INDEX IF NOT EXISTS idx_daily_file_stats_requests ON daily_file_stats(date, requests DESC);
+
+-- Recompute the summaries for a single day
+CREATE OR REPLACE FUNCTION populate_daily_request_stats(report_date DATE)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO daily_request_stats (
+        date, total_requests, unique_visitors, total_bytes, avg_response_time,
+        cache_hits, cache_misses, success_requests, error_requests, updated_at
+    )
+    SELECT 
+        report_date,
+        COUNT(*),
+        COUNT(DISTINCT client_ip),
+        COALESCE(SUM(bytes_sent), 0),
+        AVG(response_time),
+        COUNT(*) FILTER (WHERE is_hit),
+        COUNT(*) FILTER (WHERE cache_status = 'MISS'),
+        COUNT(*) FILTER (WHERE status_code >= 200 AND status_code < 300),
+        COUNT(*) FILTER (WHERE is_error),
+        CURRENT_TIMESTAMP
+    FROM request_logs
+    WHERE timestamp >= report_date AND timestamp < report_date + 1
+    ON CONFLICT (date) DO UPDATE SET
+        total_requests = EXCLUDED.total_requests,
+        unique_visitors = EXCLUDED.unique_visitors,
+        total_bytes = EXCLUDED.total_bytes,
+        avg_response_time = EXCLUDED.avg_response_time,
+        cache_hits = EXCLUDED.cache_hits,
+        cache_misses = EXCLUDED.cache_misses,
+        success_requests = EXCLUDED.success_requests,
+        error_requests = EXCLUDED.error_requests,
+        updated_at = EXCLUDED.updated_at;
+
+    DELETE FROM daily_file_stats WHERE date = report_date;
+    INSERT INTO daily_file_stats (date, file_id, requests, bytes)
+    SELECT report_date, file_id, SUM(requests), COALESCE(SUM(bytes_sent), 0)
+    FROM request_logs_hourly
+    WHERE bucket >= report_date AND bucket < report_date + 1
+    AND file_id IS NOT NULL
+    GROUP BY file_id;
+
+    DELETE FROM daily_status_stats WHERE date = report_date;
+    INSERT INTO daily_status_stats (date, status_code, count)
+    SELECT report_date, status_code, SUM(requests)
+    FROM request_logs_hourly
+    WHERE bucket >= report_date AND bucket < report_date + 1
+    GROUP BY status_code;
+END;
+$$ language 'plpgsql';
+
+-- Job entry point; config.days_ago selects the day to refresh (0 = today)
+CREATE OR REPLACE PROCEDURE refresh_daily_request_stats(job_id INT, config JSONB)
+AS $$
+BEGIN
+    PERFORM populate_daily_request_stats(
+        CURRENT_DATE - COALESCE((config->>'days_ago')::int, 0)
+    );
+END;
+$$ language 'plpgsql';
+
+-- Refresh today's summaries hourly, and finalize yesterday's shortly after midnight
+SELECT add_job('refresh_daily_request_stats', INTERVAL '1 hour', config => '{"days_ago": 0}')
+WHERE NOT EXISTS (
+    SELECT 1 FROM timescaledb_information.jobs
+    WHERE proc_name = 'refresh_daily_request_stats' AND config->>'days_ago' = '0'
+);
+SELECT add_job(
+    'refresh_daily_request_stats', INTERVAL '1 day',
+    config => '{"days_ago": 1}',
+    initial_start => date_trunc('day', NOW()) + INTERVAL '1 day 15 minutes'
+)
+WHERE NOT EXISTS (
+    SELECT 1 FROM timescaledb_information.jobs
+    WHERE proc_name = 'refresh_daily_request_stats' AND config->>'days_ago' = '1'
+);
+
 -- Grant permissions
 GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO cdn_user;
 GRANT ALL PRIVILEGES ON ALL SEQUENCES IN SCHEMA public TO cdn_user;
@@ -141,7 +290,8 @@ GRANT EXECUTE ON ALL FUNCTIONS IN SCHEMA public TO cdn_user;
 DO $$
 BEGIN
     RAISE NOTICE 'CDN Database initialized successfully!';
-    RAISE NOTICE 'Tables created: files, edge_servers, request_logs, user_sessions';
-    RAISE NOTICE 'Views created: file_stats, request_summary';
+    RAISE NOTICE 'Tables created: files, edge_servers, request_logs, user_sessions, daily_request_stats, daily_file_stats, daily_status_stats';
+    RAISE NOTICE 'Hypertables created: request_logs';
+    RAISE NOTICE 'Views created: file_stats, request_summary, request_logs_hourly';
     RAISE NOTICE 'Ready for CDN operations.';
 END $$;
\ No newline at end of file